@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+VALUE_COLUMNS = (
+    "cash",
+    "long_position_value",
+    "short_position_value",
+    "total_value",
+    "benchmark",
+)
+
+
+def build_history_frame(
+    history: Mapping[str, Sequence[object]],
+    *,
+    value_dtype: npt.DTypeLike = np.float64,
+) -> pd.DataFrame:
+    """
+    Build a DataFrame from broker history with typed columns.
+
+    Datetime-like timestamps are converted with ``pd.DatetimeIndex``, value columns
+    are cast to `value_dtype` and all other columns are converted with
+    ``np.asarray``. This avoids pandas' slower per-element type inference on lists of
+    Python objects. Timestamps of any other type, e.g. integer bar indices, are left
+    to pandas' inference so they are not reinterpreted as dates.
+    """
+    columns: dict[str, pd.DatetimeIndex | np.ndarray | Sequence[object]] = {}
+    for column, values in history.items():
+        if column == "timestamp":
+            if values and isinstance(values[0], (datetime, np.datetime64)):
+                columns[column] = pd.DatetimeIndex(values)
+            else:
+                columns[column] = values
+        elif column in VALUE_COLUMNS:
+            columns[column] = np.asarray(values, dtype=value_dtype)
+        else:
+            columns[column] = np.asarray(values)
+    return pd.DataFrame(columns)
@@ -1,10 +1,110 @@
+from dataclasses import dataclass
+
 import numpy as np
+import numpy.typing as npt
 import pandas as pd
-from scipy.stats import linregress
 
+from kissbt._history import build_history_frame
 from kissbt.broker import Broker
 
 
+@dataclass(frozen=True, slots=True)
+class _SeriesStats:
+    """Per-bar arrays and summary statistics of a single value series."""
+
+    values: np.ndarray
+    returns: np.ndarray
+    drawdown: np.ndarray
+    total_return: float
+    annual_return: float
+
+
+def _series_stats(values: np.ndarray, bars_per_year: float) -> _SeriesStats:
+    """
+    Compute per-bar returns, drawdowns and the total and annual return in one pass.
+
+    The first return is NaN, matching ``pd.Series.pct_change``. Like
+    ``pd.Series.cummax``, the running maximum skips NaN bars and is shared by the
+    drawdown calculation.
+
+    Parameters:
+        values (np.ndarray): The value series, e.g. the portfolio total value.
+        bars_per_year (float): Number of bars per year used for annualization.
+    """
+    returns = np.empty_like(values)
+    returns[0] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(values[1:], values[:-1], out=returns[1:])
+        returns[1:] -= 1.0
+        running_max = np.fmax.accumulate(values)
+        drawdown = (running_max - values) / running_max
+        growth = values[-1] / values[0]
+        annual_return = growth ** (bars_per_year / values.size) - 1
+
+    return _SeriesStats(
+        values=values,
+        returns=returns,
+        drawdown=drawdown,
+        total_return=float(growth - 1),
+        annual_return=float(annual_return),
+    )
+
+
+def _return_moments(returns: np.ndarray) -> tuple[float, float]:
+    """
+    Compute the mean and the sample standard deviation of per-bar returns.
+
+    Like the pandas reductions, NaN returns are skipped.
+
+    Parameters:
+        returns (np.ndarray): The per-bar returns, e.g. from ``_series_stats``.
+
+    Returns:
+        Tuple[float, float]: The mean and the standard deviation (ddof=1).
+    """
+    valid_returns = np.count_nonzero(~np.isnan(returns))
+    with np.errstate(invalid="ignore"):
+        mean = float(np.nanmean(returns)) if valid_returns > 0 else np.nan
+        std = float(np.nanstd(returns, ddof=1)) if valid_returns > 1 else np.nan
+    return mean, std
+
+
+def _log_equity_regression(log_values: np.ndarray) -> tuple[float, float, float, float]:
+    """
+    Fit a least-squares line against the bar index to a log-equity curve.
+
+    The x-axis is always 0..n-1, so its mean and sum of squares are known in closed
+    form and the fit reduces to a few dot products.
+
+    Parameters:
+        log_values (np.ndarray): The log-equity values, one per bar.
+
+    Returns:
+        Tuple[float, float, float, float]: Slope, standard error of the slope,
+            t-statistic of the slope and R².
+    """
+    n = log_values.size
+    if n < 2:
+        slope = slope_se = r_squared = np.nan
+    else:
+        x_centered = np.arange(n, dtype=float) - (n - 1) / 2
+        sxx = n * (n * n - 1) / 12
+        y_centered = log_values - log_values.mean()
+        slope = float(x_centered @ y_centered) / sxx
+        residuals = y_centered - slope * x_centered
+        sse = float(residuals @ residuals)
+        syy = float(y_centered @ y_centered)
+        slope_se = float(np.sqrt(sse / ((n - 2) * sxx))) if n > 2 else np.nan
+        r_squared = 1.0 - sse / syy if syy > 0 else np.nan
+
+    # a vanishing standard error means a perfect fit, the sign of the slope decides
+    if slope_se <= np.finfo(float).eps:
+        slope_tstat = np.inf if slope > 0 else (-np.inf if slope < 0 else 0.0)
+    else:
+        slope_tstat = slope / slope_se
+    return slope, slope_se, slope_tstat, r_squared
+
+
 class Analyzer:
     """
     A class for analyzing trading performance and calculating various performance
@@ -20,6 +120,7 @@ class Analyzer:
         bar_size: str = "1D",
         trading_hours_per_day: float = 6.5,
         trading_days_per_year: int = 252,
+        dtype: npt.DTypeLike = np.float64,
     ) -> None:
         """
         Initialize the Analyzer with a Broker instance and the bar size, which is the
@@ -36,6 +137,11 @@ class Analyzer:
                 markets).
             trading_days_per_year (int): Number of trading days per year (default is
                 252, which assumes US equities; adjust as needed for other markets).
+            dtype (np.dtype): Floating point type of the value columns and the derived
+                returns and drawdowns, either np.float64 (default) or np.float32.
+                np.float32 halves the memory traffic for very long histories at the
+                cost of precision. The log-equity regression is always computed in
+                float64.
         """
         if not isinstance(bar_size, str) or len(bar_size) < 2:
             raise ValueError(
@@ -45,6 +151,9 @@ class Analyzer:
             raise ValueError("trading_hours_per_day must be greater than 0")
         if trading_days_per_year <= 0:
             raise ValueError("trading_days_per_year must be greater than 0")
+        value_dtype = np.dtype(dtype)
+        if value_dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+            raise ValueError("dtype must be np.float32 or np.float64")
 
         value_str = bar_size[:-1]
         bar_unit = bar_size[-1]
@@ -69,9 +178,13 @@ class Analyzer:
         self.trading_seconds_per_year = (
             trading_days_per_year * trading_hours_per_day * 3600
         )
+        self._bars_per_year = self.trading_seconds_per_year / self.seconds_per_bar
+        self._sqrt_bars_per_year = float(np.sqrt(self._bars_per_year))
 
         self.broker = broker
-        self.analysis_df = pd.DataFrame(self.broker.history)
+        self.analysis_df = build_history_frame(
+            self.broker.history, value_dtype=value_dtype
+        )
         required_history_columns = {
             "timestamp",
             "cash",
@@ -91,29 +204,45 @@ class Analyzer:
         if self.analysis_df.empty:
             raise ValueError("broker history must not be empty")
 
-        self.analysis_df["returns"] = self.analysis_df["total_value"].pct_change()
-        self.analysis_df["drawdown"] = (
-            self.analysis_df["total_value"].cummax() - self.analysis_df["total_value"]
-        ) / self.analysis_df["total_value"].cummax()
+        self._stats = {
+            "total_value": _series_stats(
+                self.analysis_df["total_value"].to_numpy(),
+                self._bars_per_year,
+            )
+        }
+        self.analysis_df["returns"] = self._stats["total_value"].returns
+        self.analysis_df["drawdown"] = self._stats["total_value"].drawdown
+        # only the portfolio returns feed the Sharpe ratio and the volatility
+        self._returns_mean, self._returns_std = _return_moments(
+            self._stats["total_value"].returns
+        )
 
         if "benchmark" in self.analysis_df.columns:
-            self.analysis_df["benchmark_returns"] = self.analysis_df[
-                "benchmark"
-            ].pct_change()
-            self.analysis_df["benchmark_drawdown"] = (
-                self.analysis_df["benchmark"].cummax() - self.analysis_df["benchmark"]
-            ) / self.analysis_df["benchmark"].cummax()
+            self._stats["benchmark"] = _series_stats(
+                self.analysis_df["benchmark"].to_numpy(),
+                self._bars_per_year,
+            )
+            self.analysis_df["benchmark_returns"] = self._stats["benchmark"].returns
+            self.analysis_df["benchmark_drawdown"] = self._stats["benchmark"].drawdown
+
+        closed_positions = self.broker.closed_positions
+        self._pnl = np.fromiter(
+            (position.pnl for position in closed_positions),
+            dtype=float,
+            count=len(closed_positions),
+        )
 
     def _equity_curve_stats(
         self,
-        value_series: pd.Series,
+        values: np.ndarray,
         *,
         prefix: str = "",
     ) -> dict[str, float]:
         """
         Calculate statistics of the equity curve based on the log-equity curve.
         This method performs a linear regression on the log-equity curve to estimate
-        the slope, standard error, t-statistic, and R² value.
+        the slope, standard error, t-statistic, and R² value. Since the bars are evenly
+        spaced, the regression is solved in closed form.
 
         - slope: The slope of the log-equity curve, indicating the average return per
             bar.
@@ -125,27 +254,18 @@ class Analyzer:
             variance explained.
 
         Parameters:
-            value_series (pd.Series): The series of values to analyze, typically the
-                total value of the portfolio or benchmark.
+            values (np.ndarray): The values to analyze, typically the total value of
+                the portfolio or benchmark.
             prefix (str): A prefix to add to the keys in the returned dictionary, useful
                 for distinguishing between portfolio and benchmark statistics.
         """
 
-        if (value_series <= 0).any():
+        values = np.asarray(values, dtype=float)
+        if (values <= 0).any():
             raise ValueError(
                 "Value series contains non-positive values, cannot compute log-based statistics"  # noqa: E501
             )
-        y = np.log(value_series.to_numpy())
-        x = np.arange(y.size, dtype=float)
-
-        res = linregress(x, y)
-        slope, slope_se, r_squared = res.slope, res.stderr, res.rvalue**2
-
-        eps = np.finfo(float).eps
-        if slope_se <= eps:
-            slope_tstat = np.inf if slope > 0 else (-np.inf if slope < 0 else 0.0)
-        else:
-            slope_tstat = slope / slope_se
+        slope, slope_se, slope_tstat, r_squared = _log_equity_regression(np.log(values))
 
         return {
             f"{prefix}slope": slope,
@@ -206,9 +326,9 @@ class Analyzer:
             "win_rate": self._calculate_win_rate(),
             "profit_factor": self._calculate_profit_factor(),
         }
-        metrics.update(self._equity_curve_stats(self.analysis_df["total_value"]))
+        metrics.update(self._equity_curve_stats(self._stats["total_value"].values))
 
-        if "benchmark" in self.analysis_df.columns:
+        if "benchmark" in self._stats:
             metrics["benchmark_total_return"] = self._calculate_total_return(
                 "benchmark"
             )
@@ -217,7 +337,7 @@ class Analyzer:
             )
             metrics.update(
                 self._equity_curve_stats(
-                    self.analysis_df["benchmark"],
+                    self._stats["benchmark"].values,
                     prefix="benchmark_",
                 )
             )
@@ -234,10 +354,7 @@ class Analyzer:
         Returns:
             float: The total return as a decimal (e.g., 0.10 for 10% total return).
         """
-        return (
-            float(self.analysis_df[column].iloc[-1] / self.analysis_df[column].iloc[0])
-            - 1
-        )
+        return self._stats[column].total_return
 
     def _calculate_annual_return(self, column: str) -> float:
         """
@@ -262,14 +379,7 @@ class Analyzer:
         Returns:
             float: The annualized return as a decimal (e.g., 0.10 for 10% annual return)
         """
-        number_of_bars = len(self.analysis_df)
-        years = number_of_bars * self.seconds_per_bar / self.trading_seconds_per_year
-
-        total_return = (
-            self.analysis_df[column].iloc[-1] / self.analysis_df[column].iloc[0]
-        )
-        annualized_return = float((total_return ** (1 / years)) - 1)
-        return annualized_return
+        return self._stats[column].annual_return
 
     def _calculate_sharpe_ratio(self, risk_free_rate: float = 0.0) -> float:
         """
@@ -288,14 +398,14 @@ class Analyzer:
         Parameters:
             risk_free_rate (float): The annual risk-free rate (default is 0.0).
         """
-        bars_per_year = self.trading_seconds_per_year / self.seconds_per_bar
-        rf_rate_per_bar = (1 + risk_free_rate) ** (1 / bars_per_year) - 1
-        excess_returns = self.analysis_df["returns"] - rf_rate_per_bar
-
-        if np.isclose(excess_returns.std(), 0):
+        rf_rate_per_bar = (1 + risk_free_rate) ** (1 / self._bars_per_year) - 1
+        # shifting the returns by a constant leaves their standard deviation unchanged
+        if np.isclose(self._returns_std, 0):
             return 0
         return float(
-            np.sqrt(bars_per_year) * excess_returns.mean() / excess_returns.std()
+            self._sqrt_bars_per_year
+            * (self._returns_mean - rf_rate_per_bar)
+            / self._returns_std
         )
 
     def _calculate_max_drawdown(self) -> float:
@@ -315,9 +425,40 @@ class Analyzer:
         Returns:
             float: The maximum drawdown as a decimal (e.g., 0.20 for a 20% drawdown).
         """
-        max_value = self.analysis_df["total_value"].expanding().max()
-        drawdowns = (max_value - self.analysis_df["total_value"]) / max_value
-        return float(drawdowns.max())
+        drawdown = self._stats["total_value"].drawdown
+        if np.isnan(drawdown).all():
+            return np.nan
+        return float(np.nanmax(drawdown))
+
+    def _calculate_rolling_drawdown(
+        self, column: str, lookback_bars: int
+    ) -> np.ndarray:
+        """
+        Calculate the drawdown of either the portfolio or a benchmark against a rolling
+        peak.
+
+        In contrast to the drawdown column, which measures the decline from the
+        all-time high, the peak is taken over the last `lookback_bars` bars including
+        the current one. This is useful for risk analysis with a fixed horizon.
+
+        The rolling maximum is delegated to pandas, which tracks the window maximum
+        with a monotonic deque and therefore runs in linear time for any window size.
+
+        Parameters:
+            column (str): The column name to calculate the drawdown for.
+            lookback_bars (int): Number of bars considered for the rolling peak.
+
+        Returns:
+            np.ndarray: The drawdown per bar as a decimal (e.g., 0.20 for a 20%
+                drawdown).
+        """
+        if lookback_bars <= 0:
+            raise ValueError("lookback_bars must be greater than 0")
+        values = self._stats[column].values
+        rolling_max = (
+            pd.Series(values).rolling(lookback_bars, min_periods=1).max().to_numpy()
+        )
+        return (rolling_max - values) / rolling_max
 
     def _calculate_annualized_volatility(self) -> float:
         """
@@ -329,8 +470,7 @@ class Analyzer:
         Returns:
             float: The annualized volatility of the portfolio returns
         """
-        bars_per_year = self.trading_seconds_per_year / self.seconds_per_bar
-        return float(self.analysis_df["returns"].std() * np.sqrt(bars_per_year))
+        return float(self._returns_std * self._sqrt_bars_per_year)
 
     def _calculate_win_rate(self) -> float:
         """
@@ -351,12 +491,9 @@ class Analyzer:
         Returns:
             float: The win rate as a decimal (e.g., 0.60 for a 60% win rate).
         """
-        if not self.broker.closed_positions:
+        if self._pnl.size == 0:
             return 0
-        profitable_trades = sum(
-            1 for pos in self.broker.closed_positions if pos.pnl > 0
-        )
-        return float(profitable_trades / len(self.broker.closed_positions))
+        return float((self._pnl > 0).mean())
 
     def _calculate_profit_factor(self) -> float:
         """
@@ -380,13 +517,13 @@ class Analyzer:
             float: The profit factor as a ratio (e.g., 1.5 for a strategy that gains
                 $1.50 for every $1.00 lost).
         """
-        profits = sum(pos.pnl for pos in self.broker.closed_positions if pos.pnl > 0)
-        losses = abs(
-            sum(pos.pnl for pos in self.broker.closed_positions if pos.pnl < 0)
-        )
+        profits = self._pnl[self._pnl > 0].sum()
+        losses = -self._pnl[self._pnl < 0].sum()
         return float(profits / losses) if losses != 0 else float("inf")
 
-    def plot_drawdowns(self, **kwargs: object) -> None:
+    def plot_drawdowns(
+        self, lookback_bars: int | None = None, **kwargs: object
+    ) -> None:
         """
         Plot the drawdown over time for both the portfolio and benchmark (if available).
 
@@ -395,15 +532,35 @@ class Analyzer:
         drawdowns for comparison.
 
         Parameters:
+            lookback_bars (int | None): If set, drawdowns are measured against the
+                highest value of the last `lookback_bars` bars instead of the all-time
+                high (default None).
             **kwargs(Dict[str, Any]): Additional keyword arguments to pass to the plot
                 function of pandas.
         """
-        columns_to_plot = ["timestamp", "drawdown"]
-        if "benchmark_drawdown" in self.analysis_df.columns:
+        columns_to_plot = ["drawdown"]
+        if "benchmark" in self._stats:
             columns_to_plot.append("benchmark_drawdown")
 
-        self.analysis_df.loc[:, columns_to_plot].plot(
+        plot_df = self.analysis_df
+        if lookback_bars is not None:
+            # plot a small frame of the rolling drawdowns instead of copying all columns
+            plot_df = pd.DataFrame(
+                {
+                    "timestamp": self.analysis_df["timestamp"],
+                    "drawdown": self._calculate_rolling_drawdown(
+                        "total_value", lookback_bars
+                    ),
+                }
+            )
+            if "benchmark" in self._stats:
+                plot_df["benchmark_drawdown"] = self._calculate_rolling_drawdown(
+                    "benchmark", lookback_bars
+                )
+
+        plot_df.plot(
             x="timestamp",
+            y=columns_to_plot,
             title="Portfolio Drawdown Over Time",
             xlabel="Timestamp",
             ylabel="Drawdown %",
@@ -425,14 +582,15 @@ class Analyzer:
             **kwargs(Dict[str, Any]): Additional keyword arguments to pass to the plot
                 function of pandas.
         """
-        columns_to_plot = ["timestamp", "total_value"]
-        if "benchmark" in self.analysis_df.columns:
+        columns_to_plot = ["total_value"]
+        if "benchmark" in self._stats:
             columns_to_plot.append("benchmark")
         if not logy:
             columns_to_plot.append("cash")
 
-        self.analysis_df.loc[:, columns_to_plot].plot(
+        self.analysis_df.plot(
             x="timestamp",
+            y=columns_to_plot,
             title="Portfolio Equity Curve Over Time",
             xlabel="Timestamp",
             ylabel="Value",
@@ -457,23 +615,22 @@ class Analyzer:
                 DataFrame.boxplot function for customizing the appearance and behavior
                 of the box plot.
         """
-        if window_bars >= len(self.analysis_df):
+        if window_bars <= 0:
+            raise ValueError("window_bars must be greater than 0")
+        values = self._stats["total_value"].values
+        if window_bars >= values.size:
             raise ValueError(
-                f"Window size {window_bars} is too large for the available data {len(self.analysis_df)}."  # noqa: E501
+                f"Window size {window_bars} is too large for the available data {values.size}."  # noqa: E501
             )
 
-        result = {
-            "Portfolio": self.analysis_df["total_value"]
-            .pct_change(periods=window_bars)
-            .dropna()
-            .reset_index(drop=True)
-        }
-        if include_benchmark and "benchmark" in self.analysis_df.columns:
-            result["Benchmark"] = (
-                self.analysis_df["benchmark"]
-                .pct_change(periods=window_bars)
-                .dropna()
-                .reset_index(drop=True)
-            )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = {
+                "Portfolio": pd.Series(values[window_bars:] / values[:-window_bars] - 1)
+            }
+            if include_benchmark and "benchmark" in self._stats:
+                values = self._stats["benchmark"].values
+                result["Benchmark"] = pd.Series(
+                    values[window_bars:] / values[:-window_bars] - 1
+                )
 
         pd.DataFrame(result).boxplot(**kwargs)
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 
+import numpy as np
 import pandas as pd
 
+from kissbt._history import build_history_frame
 from kissbt._market_data_validation import (
     validate_benchmark_data,
     validate_market_data_frame,
@@ -51,9 +53,27 @@ class Engine:
     def run(self, data: pd.DataFrame) -> BacktestResult:
         self._validate_data(data)
 
-        for current_timestamp, current_data in data.groupby(level="timestamp"):
-            current_data = current_data.copy()
-            current_data.index = current_data.index.droplevel("timestamp")
+        timestamps = data.index.get_level_values("timestamp")
+        if timestamps.hasnans:
+            # rows without a timestamp do not belong to any bar
+            data = data[timestamps.notna()]
+            timestamps = data.index.get_level_values("timestamp")
+        if not timestamps.is_monotonic_increasing:
+            # stable sort keeps the ticker order within each bar
+            data = data.iloc[np.argsort(timestamps, kind="stable")]
+            timestamps = data.index.get_level_values("timestamp")
+
+        # rows of a bar are contiguous, so each bar is a positional slice of a frame
+        # that is already indexed by ticker
+        bars = data.droplevel("timestamp")
+        bar_starts = np.flatnonzero(timestamps[1:] != timestamps[:-1]) + 1
+        bar_bounds = np.concatenate(([0], bar_starts, [len(data)]))
+        if data.empty:
+            bar_bounds = bar_bounds[:1]
+
+        for start, stop in zip(bar_bounds[:-1], bar_bounds[1:]):
+            current_timestamp = timestamps[start]
+            current_data = bars.iloc[start:stop].copy()
 
             self.broker.update(current_data, current_timestamp)
             self.strategy.generate_orders(current_data, current_timestamp)
@@ -66,7 +86,7 @@ class Engine:
             )
 
         return BacktestResult(
-            history=pd.DataFrame(self.broker.history),
+            history=build_history_frame(self.broker.history),
             closed_positions=self.broker.closed_positions,
             final_portfolio_value=self.broker.portfolio_value,
         )
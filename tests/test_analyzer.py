@@ -1,9 +1,21 @@
+import warnings
+
+import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import pytest
 
-from kissbt.analyzer import Analyzer
+from kissbt.analyzer import Analyzer, _log_equity_regression
 from kissbt.broker import Broker
+from kissbt.entities import ClosedPosition
+
+
+@pytest.fixture
+def agg_axes():
+    plt.switch_backend("Agg")
+    fig, ax = plt.subplots()
+    yield ax
+    plt.close(fig)
 
 
 def _append_history_row(
@@ -126,3 +138,412 @@ def test_analyzer_rejects_empty_history():
 
     with pytest.raises(ValueError, match="broker history must not be empty"):
         Analyzer(broker)
+
+
+def test_returns_and_drawdown_columns():
+    broker = Broker(benchmark="SPY")
+    values = [100.0, 110.0, 99.0, 121.0]
+    benchmark_values = [100.0, 90.0, 95.0, 100.0]
+    for i, (val, bench) in enumerate(zip(values, benchmark_values)):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+            benchmark=bench,
+        )
+
+    analyzer = Analyzer(broker)
+    analysis_df = analyzer.analysis_df
+
+    np.testing.assert_allclose(
+        analysis_df["returns"], [np.nan, 0.1, -0.1, 121.0 / 99.0 - 1.0]
+    )
+    np.testing.assert_allclose(analysis_df["drawdown"], [0.0, 0.0, 0.1, 0.0])
+    np.testing.assert_allclose(
+        analysis_df["benchmark_returns"],
+        [np.nan, -0.1, 95.0 / 90.0 - 1.0, 100.0 / 95.0 - 1.0],
+    )
+    np.testing.assert_allclose(analysis_df["benchmark_drawdown"], [0.0, 0.1, 0.05, 0.0])
+
+
+def test_statistics_skip_nan_bars():
+    broker = Broker(benchmark="SPY")
+    values = [100.0, 101.0, np.nan, 103.0, 102.0, 104.0]
+    benchmark_values = [100.0, 99.0, 98.0, np.nan, 99.0, 97.0]
+    for i, (val, bench) in enumerate(zip(values, benchmark_values)):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+            benchmark=bench,
+        )
+
+    analyzer = Analyzer(broker)
+
+    for prefix, column_values in [("", values), ("benchmark_", benchmark_values)]:
+        series = pd.Series(column_values)
+        np.testing.assert_allclose(
+            analyzer.analysis_df[f"{prefix}drawdown"],
+            (series.cummax() - series) / series.cummax(),
+        )
+    assert analyzer._calculate_max_drawdown() == pytest.approx(1 - 102.0 / 103.0)
+
+    returns = pd.Series(values).pct_change()
+    assert analyzer._calculate_sharpe_ratio() == pytest.approx(
+        np.sqrt(analyzer._bars_per_year) * returns.mean() / returns.std()
+    )
+    assert analyzer._calculate_annualized_volatility() == pytest.approx(
+        returns.std() * np.sqrt(analyzer._bars_per_year)
+    )
+
+
+def test_analyzer_does_not_warn_on_degenerate_curves():
+    broker = Broker(benchmark="SPY")
+    for i, val in enumerate([100.0, 0.0, 50.0, 0.0]):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+            benchmark=np.nan,
+        )
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        analyzer = Analyzer(broker)
+        volatility = analyzer._calculate_annualized_volatility()
+
+    assert analyzer._calculate_max_drawdown() == 1.0
+    assert np.isnan(volatility)
+    assert analyzer.analysis_df["benchmark_drawdown"].isna().all()
+
+
+def test_max_drawdown_is_nan_for_all_nan_values():
+    broker = Broker()
+    for i in range(3):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=np.nan,
+        )
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        max_drawdown = Analyzer(broker)._calculate_max_drawdown()
+
+    assert np.isnan(max_drawdown)
+
+
+def test_win_rate_and_profit_factor_from_closed_positions():
+    broker = Broker()
+    _append_history_row(
+        broker, timestamp=pd.Timestamp("2023-01-01"), total_value=100000.0
+    )
+    timestamp = pd.Timestamp("2023-01-01")
+    broker._closed_positions.extend(
+        [
+            ClosedPosition("AAPL", 10.0, 100.0, timestamp, 110.0, timestamp),
+            ClosedPosition("MSFT", -5.0, 100.0, timestamp, 90.0, timestamp),
+            ClosedPosition("GOOG", 2.0, 100.0, timestamp, 75.0, timestamp),
+            ClosedPosition("AMZN", 1.0, 100.0, timestamp, 100.0, timestamp),
+        ]
+    )
+
+    analyzer = Analyzer(broker)
+
+    assert analyzer._calculate_win_rate() == pytest.approx(0.5)
+    assert analyzer._calculate_profit_factor() == pytest.approx(150.0 / 50.0)
+
+
+def test_win_rate_and_profit_factor_without_closed_positions():
+    broker = Broker()
+    _append_history_row(
+        broker, timestamp=pd.Timestamp("2023-01-01"), total_value=100000.0
+    )
+
+    analyzer = Analyzer(broker)
+
+    assert analyzer._calculate_win_rate() == 0
+    assert analyzer._calculate_profit_factor() == float("inf")
+
+
+def test_equity_curve_stats_degenerate_curves():
+    broker = Broker()
+    for i in range(3):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=100000.0,
+        )
+    analyzer = Analyzer(broker)
+
+    flat = analyzer._equity_curve_stats(analyzer._stats["total_value"].values)
+    assert flat["slope"] == 0.0
+    assert flat["slope_se"] == 0.0
+    assert flat["slope_tstat"] == 0.0
+    assert np.isnan(flat["r_squared"])
+
+    two_bars = analyzer._equity_curve_stats(np.array([100.0, 110.0]))
+    assert two_bars["slope"] == pytest.approx(np.log(1.1))
+    assert np.isnan(two_bars["slope_se"])
+    assert two_bars["r_squared"] == pytest.approx(1.0)
+
+
+def test_equity_curve_stats_rejects_non_positive_values():
+    broker = Broker()
+    _append_history_row(
+        broker, timestamp=pd.Timestamp("2023-01-01"), total_value=100000.0
+    )
+    analyzer = Analyzer(broker)
+
+    with pytest.raises(ValueError, match="non-positive values"):
+        analyzer._equity_curve_stats(np.array([100.0, 0.0, 50.0]))
+
+
+def test_performance_metrics_reject_non_positive_values_with_nan_bars():
+    broker = Broker()
+    for i, val in enumerate([100.0, np.nan, 0.0, 50.0, 60.0]):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+        )
+
+    with pytest.raises(ValueError, match="non-positive values"):
+        Analyzer(broker).get_performance_metrics()
+
+
+def test_sharpe_ratio_and_volatility_match_return_moments():
+    broker = Broker()
+    values = [100.0, 102.0, 101.0, 104.0, 103.0, 107.0]
+    for i, val in enumerate(values):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+        )
+    analyzer = Analyzer(broker)
+    returns = pd.Series(values).pct_change()
+    rf_rate_per_bar = 1.02 ** (1 / 252) - 1
+
+    assert analyzer._calculate_annualized_volatility() == pytest.approx(
+        returns.std() * np.sqrt(252)
+    )
+    assert analyzer._calculate_sharpe_ratio(0.02) == pytest.approx(
+        np.sqrt(252) * (returns - rf_rate_per_bar).mean() / returns.std()
+    )
+
+
+def test_sharpe_ratio_is_zero_for_constant_returns():
+    broker = Broker()
+    for i in range(4):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=100.0 * 1.01**i,
+        )
+
+    assert Analyzer(broker)._calculate_sharpe_ratio() == 0
+
+
+def test_plot_rolling_returns_distribution_uses_window_returns(mocker):
+    broker = Broker(benchmark="SPY")
+    values = [100.0, 110.0, 99.0, 121.0]
+    benchmark_values = [100.0, 90.0, 95.0, 100.0]
+    for i, (val, bench) in enumerate(zip(values, benchmark_values)):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+            benchmark=bench,
+        )
+    boxplot = mocker.patch.object(pd.DataFrame, "boxplot", autospec=True)
+
+    Analyzer(broker).plot_rolling_returns_distribution(2)
+
+    plotted = boxplot.call_args.args[0]
+    np.testing.assert_allclose(plotted["Portfolio"], [-0.01, 0.1])
+    np.testing.assert_allclose(plotted["Benchmark"], [-0.05, 100.0 / 90.0 - 1.0])
+
+
+def test_plot_rolling_returns_distribution_handles_zero_values(mocker):
+    broker = Broker()
+    for i, val in enumerate([100.0, 0.0, 50.0, 0.0]):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+        )
+    boxplot = mocker.patch.object(pd.DataFrame, "boxplot", autospec=True)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        Analyzer(broker).plot_rolling_returns_distribution(1)
+
+    expected = pd.Series([100.0, 0.0, 50.0, 0.0]).pct_change().iloc[1:]
+    np.testing.assert_array_equal(boxplot.call_args.args[0]["Portfolio"], expected)
+
+
+@pytest.mark.parametrize("window_bars", [0, -1, 4])
+def test_plot_rolling_returns_distribution_rejects_invalid_window(window_bars):
+    broker = Broker()
+    for i in range(4):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=100.0,
+        )
+
+    with pytest.raises(ValueError, match="(?i)window"):
+        Analyzer(broker).plot_rolling_returns_distribution(window_bars)
+
+
+def test_rolling_drawdown_uses_lookback_peak():
+    broker = Broker()
+    values = [100.0, 120.0, 90.0, 80.0, 100.0]
+    for i, val in enumerate(values):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+        )
+    analyzer = Analyzer(broker)
+
+    np.testing.assert_allclose(
+        analyzer._calculate_rolling_drawdown("total_value", 2),
+        [0.0, 0.0, 0.25, 1.0 / 9.0, 0.0],
+    )
+    np.testing.assert_allclose(
+        analyzer._calculate_rolling_drawdown("total_value", len(values)),
+        analyzer.analysis_df["drawdown"],
+    )
+    with pytest.raises(ValueError, match="lookback_bars must be greater than 0"):
+        analyzer._calculate_rolling_drawdown("total_value", 0)
+
+
+def test_plot_drawdowns_with_lookback(agg_axes):
+    broker = Broker(benchmark="SPY")
+    values = [100.0, 120.0, 90.0, 80.0]
+    for i, val in enumerate(values):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+            benchmark=val,
+        )
+    analyzer = Analyzer(broker)
+
+    analyzer.plot_drawdowns(lookback_bars=2, ax=agg_axes)
+
+    lines = agg_axes.get_lines()
+    expected = [0.0, 0.0, 0.25, 1.0 / 9.0]
+    assert [line.get_label() for line in lines] == ["drawdown", "benchmark_drawdown"]
+    np.testing.assert_allclose(lines[0].get_ydata(), expected)
+    np.testing.assert_allclose(lines[1].get_ydata(), expected)
+    np.testing.assert_allclose(analyzer.analysis_df["drawdown"], [0, 0, 0.25, 1 / 3])
+
+
+def test_analysis_df_column_dtypes():
+    broker = Broker()
+    for i in range(2):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01", tz="UTC") + pd.Timedelta(days=i),
+            total_value=100000.0 + i,
+            positions=i,
+        )
+
+    analysis_df = Analyzer(broker).analysis_df
+
+    assert isinstance(analysis_df["timestamp"].dtype, pd.DatetimeTZDtype)
+    assert str(analysis_df["timestamp"].dt.tz) == "UTC"
+    assert analysis_df["total_value"].dtype == np.float64
+    assert analysis_df["positions"].dtype == np.int64
+
+
+@pytest.mark.parametrize(
+    "timestamps", [[0, 1, 2], ["2024-01-01", "2024-01-02", "2024-01-03"]]
+)
+def test_analysis_df_keeps_non_datetime_timestamps(timestamps):
+    broker = Broker()
+    for i, timestamp in enumerate(timestamps):
+        _append_history_row(broker, timestamp=timestamp, total_value=100.0 + i)
+
+    analysis_df = Analyzer(broker).analysis_df
+
+    assert not pd.api.types.is_datetime64_any_dtype(analysis_df["timestamp"])
+    assert list(analysis_df["timestamp"]) == timestamps
+
+
+def test_float32_dtype_matches_float64_metrics():
+    rng = np.random.default_rng(7)
+    values = 100000.0 * np.cumprod(1 + rng.normal(0.0005, 0.01, 500))
+    broker = Broker(benchmark="SPY")
+    for i, val in enumerate(values):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=val,
+            cash=val,
+            benchmark=val * 0.9,
+        )
+
+    analyzer32 = Analyzer(broker, dtype=np.float32)
+    metrics32 = analyzer32.get_performance_metrics()
+    metrics64 = Analyzer(broker).get_performance_metrics()
+
+    for column in ["cash", "total_value", "benchmark", "returns", "drawdown"]:
+        assert analyzer32.analysis_df[column].dtype == np.float32
+    assert metrics32.keys() == metrics64.keys()
+    for key, value in metrics64.items():
+        assert metrics32[key] == pytest.approx(value, rel=1e-3, abs=1e-6), key
+
+
+def test_analyzer_rejects_unsupported_dtype():
+    broker = Broker()
+    _append_history_row(
+        broker, timestamp=pd.Timestamp("2023-01-01"), total_value=100000.0
+    )
+
+    with pytest.raises(ValueError, match="dtype must be np.float32 or np.float64"):
+        Analyzer(broker, dtype=np.int64)
+
+
+@pytest.mark.parametrize(
+    ("logy", "expected_columns"),
+    [
+        (False, ["total_value", "benchmark", "cash"]),
+        (True, ["total_value", "benchmark"]),
+    ],
+)
+def test_plot_equity_curve_selects_columns(agg_axes, logy, expected_columns):
+    broker = Broker(benchmark="SPY")
+    for i in range(3):
+        _append_history_row(
+            broker,
+            timestamp=pd.Timestamp("2023-01-01") + pd.Timedelta(days=i),
+            total_value=100.0 + i,
+            benchmark=100.0,
+        )
+    analyzer = Analyzer(broker)
+
+    analyzer.plot_equity_curve(logy=logy, ax=agg_axes)
+
+    lines = agg_axes.get_lines()
+    assert [line.get_label() for line in lines] == expected_columns
+    for line, column in zip(lines, expected_columns):
+        np.testing.assert_allclose(line.get_ydata(), analyzer.analysis_df[column])
+
+
+def test_log_equity_regression_matches_polyfit():
+    rng = np.random.default_rng(3)
+    log_curve = np.log(100.0 * np.cumprod(1 + rng.normal(0.001, 0.01, 300)))
+
+    slope, slope_se, slope_tstat, r_squared = _log_equity_regression(log_curve)
+
+    expected_slope, intercept = np.polyfit(np.arange(300), log_curve, 1)
+    residuals = log_curve - (intercept + expected_slope * np.arange(300))
+    assert slope == pytest.approx(expected_slope)
+    assert slope_tstat == pytest.approx(slope / slope_se)
+    assert r_squared == pytest.approx(
+        1 - residuals @ residuals / ((log_curve - log_curve.mean()) ** 2).sum()
+    )
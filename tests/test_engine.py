@@ -201,3 +201,105 @@ def test_run_raises_if_liquidation_does_not_close_positions():
 
     with pytest.raises(RuntimeError, match="failed to liquidate all positions"):
         engine.run(_build_valid_data())
+
+
+def test_run_processes_unsorted_data_in_timestamp_order():
+    class RecordingStrategy(Strategy):
+        def initialize(self) -> None:
+            self.seen: list[tuple[pd.Timestamp, list[str]]] = []
+
+        def generate_orders(
+            self, current_data: pd.DataFrame, current_timestamp: pd.Timestamp
+        ) -> None:
+            self.seen.append((current_timestamp, list(current_data.index)))
+
+    index = pd.MultiIndex.from_tuples(
+        [
+            (pd.Timestamp("2024-01-02"), "MSFT"),
+            (pd.Timestamp("2024-01-01"), "MSFT"),
+            (pd.Timestamp("2024-01-02"), "AAPL"),
+            (pd.Timestamp("2024-01-01"), "AAPL"),
+        ],
+        names=["timestamp", "ticker"],
+    )
+    data = pd.DataFrame(
+        {"open": [1.0, 2.0, 3.0, 4.0], "close": [1.0, 2.0, 3.0, 4.0]},
+        index=index,
+    )
+    broker = Broker()
+    strategy = RecordingStrategy(broker)
+    engine = Engine(broker=broker, strategy=strategy)
+
+    engine.run(data)
+
+    assert strategy.seen == [
+        (pd.Timestamp("2024-01-01"), ["MSFT", "AAPL"]),
+        (pd.Timestamp("2024-01-02"), ["MSFT", "AAPL"]),
+    ]
+
+
+def test_run_returns_typed_history_frame():
+    broker = Broker()
+    strategy = BuyOnceStrategy(broker)
+    engine = Engine(broker=broker, strategy=strategy)
+
+    result = engine.run(_build_valid_data())
+
+    assert pd.api.types.is_datetime64_dtype(result.history["timestamp"])
+    assert list(result.history["timestamp"]) == [
+        pd.Timestamp("2024-01-01"),
+        pd.Timestamp("2024-01-02"),
+    ]
+    assert result.history["cash"].dtype == "float64"
+    assert result.history["total_value"].dtype == "float64"
+    assert result.history["positions"].dtype == "int64"
+
+
+def test_run_skips_rows_without_timestamp():
+    class RecordingStrategy(Strategy):
+        def initialize(self) -> None:
+            self.seen: list[pd.Timestamp] = []
+
+        def generate_orders(
+            self, current_data: pd.DataFrame, current_timestamp: pd.Timestamp
+        ) -> None:
+            self.seen.append(current_timestamp)
+
+    index = pd.MultiIndex.from_tuples(
+        [
+            (pd.Timestamp("2024-01-01"), "AAPL"),
+            (pd.NaT, "AAPL"),
+            (pd.Timestamp("2024-01-02"), "AAPL"),
+        ],
+        names=["timestamp", "ticker"],
+    )
+    data = pd.DataFrame(
+        {"open": [1.0, 2.0, 3.0], "close": [1.0, 2.0, 3.0]},
+        index=index,
+    )
+    broker = Broker()
+    strategy = RecordingStrategy(broker)
+    engine = Engine(broker=broker, strategy=strategy)
+
+    result = engine.run(data)
+
+    assert strategy.seen == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-02")]
+    assert list(result.history["timestamp"]) == strategy.seen
+
+
+def test_run_keeps_integer_timestamps_in_history():
+    index = pd.MultiIndex.from_tuples(
+        [(0, "AAPL"), (1, "AAPL"), (2, "AAPL")],
+        names=["timestamp", "ticker"],
+    )
+    data = pd.DataFrame(
+        {"open": [1.0, 2.0, 3.0], "close": [1.0, 2.0, 3.0]},
+        index=index,
+    )
+    broker = Broker()
+    engine = Engine(broker=broker, strategy=DummyStrategy(broker))
+
+    result = engine.run(data)
+
+    assert result.history["timestamp"].dtype == "int64"
+    assert list(result.history["timestamp"]) == [0, 1, 2]